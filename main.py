@@ -1,51 +1,96 @@
 import os
-from typing import List, Dict, Any
+import re
+import calendar
+import datetime
+from typing import Annotated, List, Dict, Any, Optional
 from pathlib import Path
+from contextlib import asynccontextmanager
 from dataclasses import dataclass, field
+from functools import lru_cache
 
 
 from fastapi import FastAPI, BackgroundTasks, Request, status
-from starlette.responses import JSONResponse
 from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
-from pydantic import EmailStr
+from pydantic import AfterValidator, BaseModel, ConfigDict, EmailStr, Field, model_validator
 from dotenv import load_dotenv
+from email_validator import EmailNotValidError, validate_email
 import dateutil.parser
+import ciso8601
 
-@dataclass
+# Common answer shapes that can be reformatted straight from their digits
+_ISO_RE = re.compile(r"(\d{4})-(\d{2})-(\d{2})(?:T(\d{2}):(\d{2}):(\d{2}))?")
+_DMY_RE = re.compile(r"(\d{1,2})/(\d{1,2})/(\d{4})")
+_TIME_RE = re.compile(r"(\d{1,2}):(\d{2})(?::(\d{2}))?")
+# Lowercased form keys mapped to the RawForm aliases, so they are matched in any case
+_RAW_FORM_ALIASES = {"email address": "Email address", "reviewed": "Reviewed", "timestamp": "Timestamp"}
+
+@lru_cache(maxsize=512)
+def _norm_email(email: str) -> str:
+    """
+    Validate an email address's syntax and return its normalized form, caching the result per address.
+    """
+    try:
+        return validate_email(email, check_deliverability=False).normalized
+    except EmailNotValidError as e:
+        raise ValueError(str(e)) from e
+
+class RawForm(BaseModel):
+    """
+    Request body sent by the Google Form, the answers to each question are kept as extra fields
+    keyed by the lowercased prompt.
+    """
+    model_config = ConfigDict(extra="allow")
+
+    email_address: Annotated[str, AfterValidator(_norm_email)] = Field(alias="Email address")
+    reviewed: str = Field(alias="Reviewed")
+    timestamp: str = Field(default="", alias="Timestamp")
+
+    @model_validator(mode="before")
+    @classmethod
+    def _match_keys_in_any_case(cls, data: Any) -> Any:
+        """
+        Lowercase every key once, renaming 'email address', 'reviewed' and 'timestamp' to their aliases.
+        """
+        if isinstance(data, dict):
+            renamed = {}
+            for key, value in data.items():
+                key = key.lower()
+                renamed[_RAW_FORM_ALIASES.get(key, key)] = value
+            return renamed
+        return data
+
+
+@dataclass(slots=True)
 class Form_Data:
-    raw_form_data: Dict[str, str] = field(default_factory=dict)
-    email: EmailStr  = field(default=None, init=False)
+    email: EmailStr
+    reviewed: str
+    answers: Dict[str, Any]
     fields: List[Dict[str, str]] = field(default=None, init=False)
     approved: bool = field(default=False, init=False)
     
     def __post_init__(self) -> None:
         """
-        Initialize the Form_Data object by processing the raw_form_data.
+        Initialize the Form_Data object from the validated parts of a 'RawForm'.
         
-        Sets the 'raw_form_data' attribute to a dictionary with keys converted to lowercase and removes any empty values.
-        Sets the 'email' attribute to the value associated with the key 'email address' in 'raw_form_data'.
-        Sets the 'approved' attribute to True if the value associated with the key 'reviewed' in 'raw_form_data' is 'approved'.
-        Initializes the 'fields' attribute with a list of dictionaries containing questions and answers parsed by 'parse_date',
-        excluding keys 'email address', 'reviewed', and 'timestamp' from 'raw_form_data'.
+        Sets the 'approved' attribute to True if 'reviewed' is 'approved'.
+        Initializes the 'fields' attribute with a list of dictionaries containing questions and answers, parsed by 'parse_date'
+        when they look like a date or time, skipping empty answers. The keys of 'answers' are expected to be lowercased already.
         """
-        self.raw_form_data = {key.lower(): value for key, value in self.raw_form_data.items() if value != ""}
-            
-        self.email = self.raw_form_data["email address"]
-        if self.raw_form_data["reviewed"].lower() == "approved":
-            self.approved = True
-        
-        excluded_keys = ["email address", "reviewed", "timestamp"]
-        
-        self.fields = [{"question": key, "answer": parse_date(prompt=key, timestring=value)} for key, value in self.raw_form_data.items() if key not in excluded_keys]
+        self.approved = self.reviewed.lower() == "approved"
+
+        self.fields = [
+            {"question": key, "answer": parse_date(prompt=key, timestring=value) if _looks_like_date(value) else value}
+            for key, value in self.answers.items() if value
+        ]
 
 
     def __str__(self) -> str:
         return f"{self.email} - {self.reviewed} - {self.fields}"
 
 
-async def send_email(background_tasks: BackgroundTasks, form_data: Form_Data) -> None:
+def send_email(background_tasks: BackgroundTasks, form_data: Form_Data) -> None:
     """
-    Asynchronously sends an email using the FastAPI mail module.
+    Schedules an email to be sent in the background using the FastAPI mail module.
 
     Args:
         background_tasks (BackgroundTasks): An instance of the BackgroundTasks class from FastAPI.
@@ -54,24 +99,78 @@ async def send_email(background_tasks: BackgroundTasks, form_data: Form_Data) ->
     Returns:
         None: This function does not return anything.
 
-    This function creates a MessageSchema object with the subject, recipients, template body, and subtype.
-    It then creates an instance of the FastMail class using the conf variable.
-    The send_message method of the FastMail instance is called with the message and template_name as arguments.
+    This function creates a MessageSchema object, skipping Pydantic validation, with the subject, recipients, template body, and subtype.
+    The send_message method of the FastMail instance created at startup is called with the message and template_name as arguments.
     The send_message method is executed as a background task using the background_tasks instance.
     """
-    message = MessageSchema(
+    message = MessageSchema.model_construct(
         subject="Fastapi mail module",
         recipients=[form_data.email],
         template_body={"questions": form_data.fields, "approved": form_data.approved},
         subtype=MessageType.html
     )
 
-    fm = FastMail(conf)
-
-    background_tasks.add_task(fm.send_message, message, template_name="email_template.html")
+    background_tasks.add_task(app.state.fm.send_message, message, template_name="email_template.html")
     
     return None
 
+def _looks_like_date(answer: Any) -> bool:
+    """
+    Cheap check for answers worth handing to 'parse_date', Google Forms dates and times start with a digit
+    and are at least as long as 'H:MM'. Free text is rejected here so dateutil never has to tokenize it.
+    """
+    return isinstance(answer, str) and len(answer) >= 4 and answer[0].isdigit()
+
+def _format_digits(is_time: bool, timestring: str) -> Optional[str]:
+    """
+    Reformat ISO, D/M/Y and H:M answers directly from their digits, without building a datetime.
+
+    A time answer under a date prompt has no date to show, so it is returned unchanged.
+    Returns None when the string has another shape or out of range values, so the parsers can decide.
+    """
+    match = _ISO_RE.fullmatch(timestring)
+    if match:
+        year, month, day, hour, minute, second = match.groups(default="0")
+    elif match := _DMY_RE.fullmatch(timestring):
+        day, month, year = match.groups()
+        hour = minute = second = "0"
+    elif match := _TIME_RE.fullmatch(timestring):
+        if not is_time:
+            return timestring
+        hour, minute, second = match.groups(default="0")
+        year, month, day = "1900", "1", "1"
+    else:
+        return None
+
+    day, month, year = int(day), int(month), int(year)
+    hour, minute, second = int(hour), int(minute), int(second)
+    if not (
+        year >= 1 and 1 <= month <= 12 and 1 <= day <= calendar.monthrange(year, month)[1]
+        and hour < 24 and minute < 60 and second < 60
+    ):
+        return None
+
+    if is_time:
+        return f"{hour}:{minute}"
+    else:
+        return f"{day}/{month}/{year}"
+
+def _to_datetime(timestring: str) -> datetime.datetime:
+    """
+    Parse a date string, trying ciso8601 before dateutil.
+
+    ciso8601 only sees calendar dates, since it would also accept ordinal and week dates
+    such as '2024-123' or '2024W10', which are more likely reference numbers.
+    """
+    if len(timestring) >= 10 and timestring[4] == "-" and timestring[7] == "-":
+        try:
+            return ciso8601.parse_datetime(timestring)
+        except ValueError:
+            pass
+
+    return dateutil.parser.parse(timestring)
+
+@lru_cache(maxsize=2048)
 def parse_date(prompt: str, timestring: str) -> str:
     """
     A function to parse a date string based on the provided prompt.
@@ -83,36 +182,52 @@ def parse_date(prompt: str, timestring: str) -> str:
     Returns:
         str: The parsed date string based on the prompt.
     """
+    lowered = prompt.lower()
+    is_time = "hora" in lowered or "hour" in lowered
+
+    formatted = _format_digits(is_time, timestring)
+    if formatted is not None:
+        return formatted
+
     try:
-        date = dateutil.parser.parse(timestring)
+        date = _to_datetime(timestring)
     except dateutil.parser.ParserError:
         return timestring
     
-    if "hora" in prompt.lower() or "hour" in prompt.lower():
+    if is_time:
         return f"{date.hour}:{date.minute}"
     else:
         return f"{date.day}/{date.month}/{date.year}"
 
 
 
-load_dotenv(".env")
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    """
+    Load the mail credentials and create the shared FastMail client on application startup.
+    """
+    load_dotenv(".env")
+
+    app.state.conf = ConnectionConfig(
+        MAIL_USERNAME = os.getenv('MAIL_USERNAME'),
+        MAIL_PASSWORD = os.getenv('MAIL_PASSWORD'),
+        MAIL_FROM = os.getenv('MAIL_USERNAME'),
+        MAIL_FROM_NAME="Caxton College",
+        MAIL_PORT = 587,
+        MAIL_SERVER = "smtp.gmail.com",
+        MAIL_STARTTLS = True,
+        MAIL_SSL_TLS = False,
+        USE_CREDENTIALS = True,
+        VALIDATE_CERTS = True,
+        TEMPLATE_FOLDER = Path(__file__).parent / 'templates',
+    )
 
-conf = ConnectionConfig(
-    MAIL_USERNAME = os.getenv('MAIL_USERNAME'),
-    MAIL_PASSWORD = os.getenv('MAIL_PASSWORD'),
-    MAIL_FROM = os.getenv('MAIL_USERNAME'),
-    MAIL_FROM_NAME="Caxton College",
-    MAIL_PORT = 587,
-    MAIL_SERVER = "smtp.gmail.com",
-    MAIL_STARTTLS = True,
-    MAIL_SSL_TLS = False,
-    USE_CREDENTIALS = True,
-    VALIDATE_CERTS = True,
-    TEMPLATE_FOLDER = Path(__file__).parent / 'templates',
-)
+    app.state.fm = FastMail(app.state.conf)
 
+    yield
 
-app = FastAPI()
+
+app = FastAPI(lifespan=_lifespan)
 
 """
 Every time a different host sends the request, this won't work :(
@@ -146,23 +261,27 @@ async def root():
 @app.post("/update/")
 async def form_update(
     background_tasks: BackgroundTasks,
-    raw_form_data: Dict[str, Any]
-    ) -> JSONResponse:
+    raw_form_data: RawForm
+    ) -> Dict[str, str]:
     """
     Asynchronously updates the form data and sends an email using the FastAPI mail module.
 
     Args:
         background_tasks (BackgroundTasks): An instance of the BackgroundTasks class from FastAPI.
-        raw_form_data (Dict[str, Any]): A dictionary containing the raw form data.
+        raw_form_data (RawForm): The validated raw form data.
 
     Returns:
-        JSONResponse: A JSON response indicating that the email has been sent.
+        Dict[str, str]: A message indicating that the email has been sent, serialized to JSON by FastAPI.
 
-    This function creates a `Form_Data` object with the raw form data. It then calls the `send_email` function asynchronously, passing in the `background_tasks` and `form_data` objects. Finally, it returns a JSON response indicating that the email has been sent.
+    This function creates a `Form_Data` object from the validated email, review status and answers. It then calls the `send_email` function, passing in the `background_tasks` and `form_data` objects. Finally, it returns a JSON response indicating that the email has been sent.
     """
     
-    form_data = Form_Data(raw_form_data=raw_form_data)
+    form_data = Form_Data(
+        email=raw_form_data.email_address,
+        reviewed=raw_form_data.reviewed,
+        answers=raw_form_data.model_extra,
+    )
     
-    await send_email(background_tasks=background_tasks, form_data=form_data)
+    send_email(background_tasks=background_tasks, form_data=form_data)
 
-    return JSONResponse(status_code=200, content={"message": "email has been sent"})
\ No newline at end of file
+    return {"message": "email has been sent"}
\ No newline at end of file
@@ -0,0 +1,154 @@
+import dateutil.parser
+import pytest
+from pydantic import ValidationError
+
+from main import Form_Data, RawForm, _format_digits, _looks_like_date, _norm_email, parse_date
+
+
+def reference(prompt: str, timestring: str) -> str:
+    """
+    Format a date string the slow way, with dateutil reading D/M/Y answers day first.
+    """
+    date = dateutil.parser.parse(timestring, dayfirst="/" in timestring)
+    if "hora" in prompt or "hour" in prompt:
+        return f"{date.hour}:{date.minute}"
+    return f"{date.day}/{date.month}/{date.year}"
+
+
+@pytest.mark.parametrize("timestring", [
+    "2024-03-05",
+    "2024-03-05T10:20:30",
+    "2024-12-31T23:59:59",
+    "2024-02-29",
+    "05/03/2024",
+    "5/3/2024",
+    "31/12/1999",
+])
+@pytest.mark.parametrize("prompt", ["fecha de salida", "hora de llegada", "start hour"])
+def test_dates_match_dateutil(prompt, timestring):
+    assert _format_digits("hora" in prompt or "hour" in prompt, timestring) is not None
+    assert parse_date(prompt, timestring) == reference(prompt, timestring)
+
+
+@pytest.mark.parametrize("timestring", ["10:05", "10:05:00", "9:30", "00:00", "23:59:59"])
+def test_times_match_dateutil(timestring):
+    assert _format_digits(True, timestring) is not None
+    assert parse_date("hora de llegada", timestring) == reference("hora de llegada", timestring)
+
+
+@pytest.mark.parametrize("timestring", ["10:05", "12:30:45"])
+def test_time_answer_under_date_prompt_is_returned_unchanged(timestring):
+    assert parse_date("fecha", timestring) == timestring
+
+
+@pytest.mark.parametrize("timestring", [
+    "0000-01-01",
+    "2024-13-05",
+    "2024-00-10",
+    "2023-02-29",
+    "30/02/2024",
+    "31/04/2024",
+    "1/13/2024",
+    "2024-03-05T24:00:00",
+    "2024-03-05T10:60:00",
+    "2024-03-05T10:20:99",
+])
+@pytest.mark.parametrize("is_time", [False, True])
+def test_out_of_range_values_are_not_reformatted(is_time, timestring):
+    assert _format_digits(is_time, timestring) is None
+
+
+@pytest.mark.parametrize("timestring", [
+    "0000-01-01",
+    "30/02/2024",
+    "2023-02-29",
+    "2024-001",
+    "2024-123",
+    "2024-366",
+    "2024W10",
+])
+@pytest.mark.parametrize("prompt", ["fecha", "hora"])
+def test_impossible_dates_are_returned_unchanged(prompt, timestring):
+    assert parse_date(prompt, timestring) == timestring
+
+
+@pytest.mark.parametrize("timestring", ["24:00", "10:60", "10:05:99"])
+def test_impossible_times_are_returned_unchanged(timestring):
+    assert _format_digits(True, timestring) is None
+    assert parse_date("hora", timestring) == timestring
+
+
+@pytest.mark.parametrize("answer", ["9:30", "10:05:00", "2024-03-05", "05/03/2024"])
+def test_date_shaped_answers_are_parsed(answer):
+    assert _looks_like_date(answer)
+
+
+@pytest.mark.parametrize("answer", ["Bob", "N/A", "Room 12", "9am", "", ["1st option"], 2024])
+def test_other_answers_skip_the_parsers(answer):
+    assert not _looks_like_date(answer)
+
+
+@pytest.mark.parametrize("email_key, reviewed_key, timestamp_key", [
+    ("Email address", "Reviewed", "Timestamp"),
+    ("email address", "reviewed", "timestamp"),
+    ("EMAIL ADDRESS", "REVIEWED", "TimeStamp"),
+])
+def test_raw_form_matches_keys_in_any_case(email_key, reviewed_key, timestamp_key):
+    form = RawForm.model_validate({
+        email_key: "x@y.com",
+        reviewed_key: "Approved",
+        timestamp_key: "2024-03-05T10:20:30",
+        "Fecha De Salida": "2024-03-05",
+    })
+    assert form.email_address == "x@y.com"
+    assert form.reviewed == "Approved"
+    assert form.timestamp == "2024-03-05T10:20:30"
+    assert form.model_extra == {"fecha de salida": "2024-03-05"}
+
+
+def test_raw_form_normalizes_the_email_once_per_address():
+    _norm_email.cache_clear()
+    for _ in range(3):
+        form = RawForm.model_validate({"Email address": "Foo@EXAMPLE.com", "Reviewed": "Approved"})
+        assert form.email_address == "Foo@example.com"
+    assert _norm_email.cache_info().misses == 1
+
+
+def test_raw_form_timestamp_is_optional():
+    form = RawForm.model_validate({"Email address": "x@y.com", "Reviewed": "Approved"})
+    assert form.timestamp == ""
+
+
+@pytest.mark.parametrize("body", [
+    {"Email address": "x@y.com"},
+    {"Reviewed": "Approved"},
+    {"Email address": "not an email", "Reviewed": "Approved"},
+])
+def test_raw_form_rejects_missing_keys_and_bad_emails(body):
+    with pytest.raises(ValidationError):
+        RawForm.model_validate(body)
+
+
+def test_form_data_keeps_only_non_empty_answers():
+    form = RawForm.model_validate({
+        "Email address": "x@y.com",
+        "Reviewed": "approved",
+        "Timestamp": "2024-03-05T10:20:30",
+        "Hora de llegada": "10:05:00",
+        "Fecha": "2024-03-05",
+        "Name": "Bob",
+        "Comments": "",
+    })
+    form_data = Form_Data(email=form.email_address, reviewed=form.reviewed, answers=form.model_extra)
+
+    assert form_data.email == "x@y.com"
+    assert form_data.approved
+    assert form_data.fields == [
+        {"question": "hora de llegada", "answer": "10:5"},
+        {"question": "fecha", "answer": "5/3/2024"},
+        {"question": "name", "answer": "Bob"},
+    ]
+
+
+def test_form_data_is_not_approved_unless_reviewed_says_so():
+    assert not Form_Data(email="x@y.com", reviewed="Pending", answers={}).approved